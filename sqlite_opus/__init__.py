@@ -11,24 +11,60 @@ The dashboard will be available at:
     http://localhost:5000/sqlite-opus
 """
 
-from flask import Blueprint
+import importlib
 
-from sqlite_opus.core import Config, get_templates_path, get_static_path
-from sqlite_opus.database import DatabaseManager
+from sqlite_opus.core import Config
 
 __version__ = "0.3.1"
 
 # Module-level configuration
 config = Config()
 
-# Module-level blueprint
-blueprint = Blueprint(
-    config.blueprint_name,
-    __name__,
-    template_folder=get_templates_path(),
-    static_folder=get_static_path(),
-    static_url_path="/sqlite_opus/static"
-)
+# Set once register_routes() has populated the module-level blueprint
+_routes_registered = False
+
+# Attributes that pull in Flask/sqlite3, imported on first access (see __getattr__)
+_LAZY = {
+    "DatabaseManager": ("sqlite_opus.database", "DatabaseManager"),
+}
+
+
+def _create_blueprint():
+    """Build the dashboard blueprint (imports Flask, resolves template/static paths)."""
+    from flask import Blueprint
+    from sqlite_opus.core import get_templates_path, get_static_path
+
+    return Blueprint(
+        config.blueprint_name,
+        __name__,
+        template_folder=get_templates_path(),
+        static_folder=get_static_path(),
+        static_url_path="/sqlite_opus/static"
+    )
+
+
+def _get_blueprint():
+    """Return the module-level blueprint, building it on first use."""
+    global blueprint
+    try:
+        return blueprint
+    except NameError:
+        blueprint = _create_blueprint()
+        return blueprint
+
+
+def __getattr__(name):
+    """Import lazy module attributes on first access and cache them."""
+    if name == "blueprint":
+        # Reading sqlite_opus.blueprint before bind() still gets the default blueprint
+        return _get_blueprint()
+    try:
+        module_name, attr = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
 
 
 def bind(
@@ -41,6 +77,7 @@ def bind(
     auth_password: str = None,
     allow_dml: bool = None,
     db_path: str = None,
+    pragmas: dict = None,
 ):
     """
     Bind SQLite Opus dashboard to a Flask application.
@@ -59,6 +96,7 @@ def bind(
         auth_password: Basic Auth password for dashboard routes (optional).
         allow_dml: If True, allow DML (INSERT/UPDATE/DELETE/...) in query API (default: False).
         db_path: Path to SQLite database file for auto-connect (optional). Can also set via config.db_path before bind().
+        pragmas: PRAGMAs overriding the connection defaults, e.g. {"synchronous": "FULL"} (optional).
 
     Example:
         >>> from flask import Flask
@@ -88,10 +126,14 @@ def bind(
         config.allow_dml = allow_dml
     if db_path is not None:
         config.db_path = db_path
+    if pragmas is not None:
+        config.pragmas = pragmas
+
+    from sqlite_opus.database import DatabaseManager
 
     # Initialize database manager and attach to app
     if not hasattr(app, "sqlite_opus_db_manager"):
-        app.sqlite_opus_db_manager = DatabaseManager()
+        app.sqlite_opus_db_manager = DatabaseManager(pragmas=config.pragmas)
     
     # Auto-connect to database if db_path is configured
     if config.db_path:
@@ -113,10 +155,23 @@ def bind(
         except ImportError:
             pass  # Flask-CORS not installed, skip
     
+    # Binding the same app twice would trip Flask's duplicate-blueprint assertion
+    if config.blueprint_name in app.blueprints:
+        return
+
+    global blueprint, _routes_registered
+    blueprint = _get_blueprint()
+    if _routes_registered:
+        # Routes close over the app they were registered for, so every further
+        # app (e.g. one per test) gets a fresh blueprint instead of piling
+        # duplicate deferred functions onto an already-registered one
+        blueprint = _create_blueprint()
+
     # Import and register routes
     # This must be done here to avoid circular imports
     from sqlite_opus.routes import register_routes
     register_routes(blueprint, app)
+    _routes_registered = True
     
     # Register blueprint with the app
     app.register_blueprint(blueprint, url_prefix=f"/{config.url_prefix}")
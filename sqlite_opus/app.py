@@ -13,7 +13,7 @@ from flask import Flask, Blueprint
 from flask_cors import CORS
 
 from sqlite_opus.database import DatabaseManager
-from sqlite_opus.routes import register_routes
+from sqlite_opus.routes import register_routes, orjson, OrjsonProvider
 from sqlite_opus.core import get_templates_path, get_static_path
 from sqlite_opus import config
 
@@ -30,6 +30,10 @@ def create_app(app_config=None):
     """
     app = Flask(__name__)
     
+    # Serialize JSON with orjson when installed (this app is ours, unlike one passed to bind())
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    
     # Enable CORS
     CORS(app)
     
@@ -45,7 +49,7 @@ def create_app(app_config=None):
     config.db_path = "db.sqlite3"  # or any path to your SQLite database
     
     # Initialize database manager
-    app.sqlite_opus_db_manager = DatabaseManager()
+    app.sqlite_opus_db_manager = DatabaseManager(pragmas=config.pragmas)
     
     # Auto-connect to database if db_path is configured
     if config.db_path:
@@ -1,32 +1,36 @@
 """Core configuration and utilities for SQLite Opus."""
 
+import functools
 import os
-from typing import Optional
-from flask import Flask
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
+if TYPE_CHECKING:
+    from flask import Flask
 
+
+@dataclass(slots=True)
 class Config:
     """Configuration class for SQLite Opus dashboard."""
-    
-    def __init__(self):
-        """Initialize configuration with default values."""
-        self.app: Optional[Flask] = None
-        self.url_prefix: str = "sqlite-opus"  # URL prefix for dashboard routes
-        self.blueprint_name: str = "sqlite_opus"
-        self.max_query_results: int = 1000
-        self.enable_cors: bool = True
-        self.db_path: Optional[str] = None  # Pre-configured database path
-        self.auth_user: Optional[str] = None  # Basic Auth username (optional)
-        self.auth_password: Optional[str] = None  # Basic Auth password (optional)
-        self.allow_dml: bool = False  # If True, allow DML (INSERT/UPDATE/DELETE/...) in query API
-        self.query_results_per_page: int = 10  # Rows per page when pagination is enabled
+
+    app: Optional["Flask"] = field(default=None, repr=False)
+    url_prefix: str = "sqlite-opus"  # URL prefix for dashboard routes
+    blueprint_name: str = "sqlite_opus"
+    max_query_results: int = 1000
+    enable_cors: bool = True
+    db_path: Optional[str] = None  # Pre-configured database path
+    auth_user: Optional[str] = None  # Basic Auth username (optional)
+    auth_password: Optional[str] = field(default=None, repr=False)  # Basic Auth password (optional)
+    allow_dml: bool = False  # If True, allow DML (INSERT/UPDATE/DELETE/...) in query API
+    query_results_per_page: int = 10  # Rows per page when pagination is enabled
+    pragmas: Dict[str, Any] = field(default_factory=dict)  # Extra/overriding PRAGMAs for every connection
 
     def init_from(self, **kwargs):
         """
         Initialize configuration from keyword arguments.
         
         Args:
-            **kwargs: Configuration options:
+            **kwargs: Configuration options (unknown names are ignored):
                 - url_prefix: URL prefix for dashboard (default: "sqlite-opus")
                 - max_query_results: Maximum number of query results (default: 1000)
                 - enable_cors: Enable CORS support (default: True)
@@ -34,26 +38,15 @@ class Config:
                 - auth_user: Basic Auth username for index route (default: None)
                 - auth_password: Basic Auth password for index route (default: None)
                 - allow_dml: Allow DML queries in /api/query/ (default: False)
-        - query_results_per_page: Rows per page for query results (default: 50)
+                - query_results_per_page: Rows per page for query results (default: 10)
+                - pragmas: PRAGMAs overriding the connection defaults (default: {})
         """
-        if "url_prefix" in kwargs:
-            self.url_prefix = kwargs["url_prefix"]
-        if "max_query_results" in kwargs:
-            self.max_query_results = kwargs["max_query_results"]
-        if "enable_cors" in kwargs:
-            self.enable_cors = kwargs["enable_cors"]
-        if "db_path" in kwargs:
-            self.db_path = kwargs["db_path"]
-        if "auth_user" in kwargs:
-            self.auth_user = kwargs["auth_user"]
-        if "auth_password" in kwargs:
-            self.auth_password = kwargs["auth_password"]
-        if "allow_dml" in kwargs:
-            self.allow_dml = kwargs["allow_dml"]
-        if "query_results_per_page" in kwargs:
-            self.query_results_per_page = kwargs["query_results_per_page"]
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
 
 
+@functools.cache
 def get_package_path() -> str:
     """
     Get the absolute path to the sqlite_opus package directory.
@@ -64,6 +57,7 @@ def get_package_path() -> str:
     return os.path.abspath(os.path.dirname(__file__))
 
 
+@functools.cache
 def get_templates_path() -> str:
     """
     Get the absolute path to templates directory.
@@ -74,6 +68,7 @@ def get_templates_path() -> str:
     return os.path.join(get_package_path(), "templates")
 
 
+@functools.cache
 def get_static_path() -> str:
     """
     Get the absolute path to static directory.
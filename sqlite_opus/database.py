@@ -1,103 +1,630 @@
 """SQLite database connection and query management."""
 
+import functools
+import hashlib
+import json
+import queue
 import re
 import sqlite3
 import threading
+import time
+import warnings
+import weakref
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 
+# Applied to every connection: in-memory temp tables, a 64 MiB page cache
+# and 256 MiB of memory-mapped I/O
+_CONNECTION_PRAGMAS = (
+    "PRAGMA temp_store=MEMORY;"
+    "PRAGMA cache_size=-65536;"
+    "PRAGMA mmap_size=268435456;"
+)
+# Complete per-role scripts, each run with a single executescript() on open.
+# WAL lets readers run while the writer holds the database; synchronous=NORMAL
+# skips the fsync on every commit (roughly doubling write throughput) at the
+# cost of possibly losing the last commits on power loss, never corruption.
+_WRITER_PRAGMAS = _CONNECTION_PRAGMAS + (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA foreign_keys=ON;"
+)
+_READER_PRAGMAS = _CONNECTION_PRAGMAS + "PRAGMA query_only=1;"
 
+# A PRAGMA value that can be embedded as is: integer, keyword or name
+_PRAGMA_VALUE_RE = re.compile(r"\A-?\w+\Z")
+
+# Plain ASCII SQL identifier of sane length, safe to embed in double quotes
+_IDENT_RE = re.compile(r"\A[A-Za-z_][A-Za-z0-9_]{0,127}\Z")
+
+# Writes that can share a transaction with other queued writes (and so a commit)
+_BATCHABLE_RE = re.compile(r"\s*(?:INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+# Most queued writes run back to back before a single commit
+_WRITE_BATCH_SIZE = 64
+
+# Statements that change the schema; the dashboard's own ones drop the metadata cache right away
+_DDL_RE = re.compile(r"^\s*(?:CREATE|ALTER|DROP)\b", re.IGNORECASE)
+
+# Schema SQL, columns and indexes of one table in a single statement (needs the JSON1 functions)
+_TABLE_DETAILS_SQL = """
+SELECT
+    (SELECT sql FROM sqlite_master WHERE tbl_name = ?1 AND type IN ('table', 'view')),
+    (SELECT json_group_array(json_array(name, type, "notnull", dflt_value, pk)) FROM pragma_table_info(?1)),
+    (SELECT json_group_array(json_array(name, "unique", origin)) FROM pragma_index_list(?1))
+"""
+
+# The same three parts as rows tagged by kind (0 column, 1 index, 2 schema), for SQLite without JSON1
+_TABLE_DETAILS_ROWS_SQL = """
+SELECT 0, name, type, "notnull", dflt_value, pk FROM pragma_table_info(?1)
+UNION ALL
+SELECT 1, name, "unique", origin, NULL, NULL FROM pragma_index_list(?1)
+UNION ALL
+SELECT 2, sql, NULL, NULL, NULL, NULL FROM sqlite_master WHERE tbl_name = ?1 AND type IN ('table', 'view')
+"""
+
+# One row of pragma_table_info / pragma_index_list, as used by the dashboard
+ColumnInfo = namedtuple("ColumnInfo", "name type notnull dflt_value pk")
+IndexInfo = namedtuple("IndexInfo", "name unique origin")
+# One row of pragma_table_list (ncol/wr/strict are None before SQLite 3.37)
+TableInfo = namedtuple("TableInfo", "name type ncol wr strict")
+
+# User tables and views of the main schema, with their type, in one pass (SQLite 3.37+).
+# Virtual tables (FTS5, R*Tree, ...) are listed with type "virtual", their shadow
+# tables are left out; sqlite_master reports both as plain tables.
+if sqlite3.sqlite_version_info >= (3, 37, 0):
+    _TABLE_LIST_SQL = (
+        "SELECT name, type, ncol, wr, strict FROM pragma_table_list "
+        "WHERE schema = 'main' AND type IN ('table', 'view', 'virtual') "
+        "AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' "
+        "ORDER BY name"
+    )
+else:
+    _TABLE_LIST_SQL = (
+        "SELECT name, type, NULL, NULL, NULL FROM sqlite_master "
+        "WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' "
+        "ORDER BY name"
+    )
+
+
+# Introspection entries kept per schema version: plenty for a large schema, and
+# bounded because table names come straight from request URLs
+_META_CACHE_SIZE = 1024
+_META_CACHE_TTL = 3600.0
+
+# Up to two trailing "LIMIT n" / "OFFSET n" clauses, in either order
+_LIMIT_OFFSET_RE = re.compile(r"(?:\s+(?:OFFSET\s+\d+|LIMIT\s+\d+)){1,2}\s*$", re.IGNORECASE)
+
+
+def _pragma_script(pragmas: Dict[str, Any]) -> str:
+    """Render {name: value} as a PRAGMA script, rejecting anything that isn't a plain name/value."""
+    parts = []
+    for name, value in pragmas.items():
+        if not _IDENT_RE.match(name) or not _PRAGMA_VALUE_RE.match(str(value)):
+            raise ValueError(f"Invalid PRAGMA: {name}={value!r}")
+        parts.append(f"PRAGMA {name}={value};")
+    return "".join(parts)
+
+
+@functools.lru_cache(maxsize=256)
 def _strip_limit_offset(query: str) -> str:
     """Remove trailing LIMIT and OFFSET clauses from a SQL query (case-insensitive)."""
     q = query.strip().rstrip(";").strip()
-    # Remove LIMIT n and OFFSET n in either order (from the end)
-    for _ in range(2):  # at most two clauses
-        # Match OFFSET <digits> or LIMIT <digits> at end
-        m = re.search(r"\s+(?:OFFSET\s+\d+|LIMIT\s+\d+)\s*$", q, re.IGNORECASE)
-        if m:
-            q = q[: m.start()].rstrip()
+    return _LIMIT_OFFSET_RE.sub("", q).rstrip()
+
+
+def _coalesced(method):
+    """Let concurrent identical calls of a read-only DatabaseManager method share one execution."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, self.current_db_path, args, tuple(sorted(kwargs.items())))
+        return self._coalesce(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+
+class _TTLCache:
+    """Small thread-safe mapping whose entries expire ttl seconds after being set.
+
+    Once maxsize entries are stored, the oldest one is evicted.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class _Connection(sqlite3.Connection):
+    """sqlite3.Connection that supports weak references (the base class does not)."""
+
+
+class _StorageWorker(threading.Thread):
+    """Thread that owns the read-write connection and runs queued writes on it.
+
+    Callers submit fn(conn) and wait on the returned Future. Everything queued
+    while the previous batch ran executes back to back: batchable writes
+    (INSERT/UPDATE/DELETE/REPLACE) share one transaction and one commit, each
+    inside its own savepoint so a failing statement only undoes itself. Other
+    statements (DDL, VACUUM, PRAGMA...) first commit the pending batch and then
+    run on their own, as they would outside the queue.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock):
+        super().__init__(name="sqlite-opus-writer", daemon=True)
+        self._conn = conn
+        self._lock = lock  # Held while a batch runs, so writer() callers never interleave with it
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._submit_lock = threading.Lock()
+        self._stopped = False
+
+    def submit(self, fn, batchable: bool = False) -> Future:
+        future = Future()
+        with self._submit_lock:
+            if self._stopped:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            self._queue.put((fn, batchable, future))
+        return future
+
+    def stop(self):
+        """Run everything already queued, then close the connection and end the thread."""
+        with self._submit_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(None)
+        # A finalizer can run on this very thread (garbage collection happens anywhere)
+        if threading.current_thread() is not self:
+            self.join()
+
+    def run(self):
+        while True:
+            ops = [self._queue.get()]
+            while ops[-1] is not None and len(ops) < _WRITE_BATCH_SIZE:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = ops[-1] is None
+            if stop:
+                ops.pop()
+            with self._lock:
+                try:
+                    self._run_batch(ops)
+                except Exception as e:
+                    # E.g. ROLLBACK TO or rollback() failing: answer whoever is still
+                    # waiting and keep serving, a dead worker would hang every write
+                    self._abort(ops, e)
+                if stop:
+                    self._conn.close()
+            # Queued callables can reference the DatabaseManager; don't keep them
+            # alive while blocked on the next get(), or the pool is never collected
+            del ops
+            if stop:
+                return
+
+    def _abort(self, ops: list, error: Exception):
+        """Fail every future of ops not answered yet and drop whatever transaction is left."""
+        for _, _, future in ops:
+            if not future.done():
+                future.set_exception(error)
+        try:
+            if self._conn.in_transaction:
+                self._conn.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _run_batch(self, ops: list):
+        conn = self._conn
+        pending = []  # (future, result) of batched writes waiting for the commit
+        for fn, batchable, future in ops:
+            if not batchable:
+                self._commit(pending)
+                pending = []
+                try:
+                    result = fn(conn)
+                    if conn.in_transaction:
+                        conn.commit()
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+                continue
+            try:
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")
+                conn.execute("SAVEPOINT queued_write")
+                result = fn(conn)
+                conn.execute("RELEASE queued_write")
+            except Exception as e:
+                future.set_exception(e)
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK TO queued_write")
+                    conn.execute("RELEASE queued_write")
+                else:
+                    # The error rolled back the whole transaction, and the batch with it
+                    for other, _ in pending:
+                        other.set_exception(e)
+                    pending = []
+            else:
+                pending.append((future, result))
+        self._commit(pending)
+
+    def _commit(self, pending: list):
+        try:
+            if self._conn.in_transaction:
+                self._conn.commit()
+        except Exception as e:
+            self._conn.rollback()
+            for future, _ in pending:
+                future.set_exception(e)
         else:
-            break
-    return q
+            for future, result in pending:
+                future.set_result(result)
+
+
+class _ConnectionPool:
+    """Per-thread read-only connections plus one shared read-write connection.
+
+    Each thread lazily opens its own read-only connection, so SELECTs never
+    wait on a lock or on each other (the database is switched to WAL mode so
+    they don't block on the writer either). Writes are queued to a
+    _StorageWorker that owns the writer, so concurrent writes share commits
+    and request threads hold no lock while they wait. Readers are in
+    autocommit mode: they never write, so there is no transaction for the
+    sqlite3 module to manage. All connections use check_same_thread=False so
+    close() can close them from whichever thread disconnects. A database
+    that can't be written gets no writer at all, so it can still be browsed;
+    writes then fail with OperationalError.
+    """
+
+    def __init__(self, db_path: str, writer_pragmas: str = _WRITER_PRAGMAS, reader_pragmas: str = _READER_PRAGMAS):
+        self.db_path = db_path
+        self._closed = False
+        self._reader_pragmas = reader_pragmas
+        self._write_lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._worker: Optional[_StorageWorker] = None
+        try:
+            self._writer = self._open(db_path, writer_pragmas)
+        except sqlite3.OperationalError as e:
+            # A file (or filesystem) we can't write: browse it through the
+            # readers alone, in whatever journal mode it already uses
+            if "readonly" not in str(e):
+                raise
+        else:
+            self._worker = _StorageWorker(self._writer, self._write_lock)
+            self._worker.start()
+            # Stops the worker and closes the writer when the pool is dropped without
+            # close() (e.g. a DatabaseManager of a per-test app); close() runs it too
+            self._finalizer = weakref.finalize(self, self._worker.stop)
+        self._reader_uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self._local = threading.local()
+        # Every reader still open; a reader drops out when its thread exits
+        self._readers: "weakref.WeakSet[_Connection]" = weakref.WeakSet()
+        self._readers_lock = threading.Lock()  # Guards _readers only, never held during queries
+
+    @staticmethod
+    def _open(database: str, pragmas: str, uri: bool = False, **kwargs) -> sqlite3.Connection:
+        # Introspection queries bind the table name (pragma_table_info(?) etc.), so
+        # their SQL text is fixed and stays prepared in the statement cache
+        conn = sqlite3.connect(
+            database, check_same_thread=False, uri=uri, factory=_Connection, cached_statements=256, **kwargs
+        )
+        # No row_factory: every caller reads rows by position, and plain tuples
+        # skip a sqlite3.Row wrapper per row and serialize directly to JSON arrays
+        try:
+            conn.executescript(pragmas)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    @property
+    def read_only(self) -> bool:
+        """True if the database could only be opened for reading (no writer)."""
+        return self._writer is None
+
+    def _check_writable(self):
+        if self._writer is None:
+            raise sqlite3.OperationalError(f"'{self.db_path}' is read-only")
+
+    def _get_reader(self) -> sqlite3.Connection:
+        """Return this thread's read-only connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open(self._reader_uri, self._reader_pragmas, uri=True, isolation_level=None)
+            with self._readers_lock:
+                if self._closed:
+                    conn.close()
+                    raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+                self._readers.add(conn)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Use this thread's read-only connection."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        yield self._get_reader()
+
+    @contextmanager
+    def writer(self):
+        """Hold the read-write connection exclusively, between worker batches."""
+        self._check_writable()
+        with self._write_lock:
+            yield self._writer
+
+    def write(self, fn, batchable: bool = False):
+        """Run fn(writer) on the storage worker and return its result once committed."""
+        self._check_writable()
+        return self._worker.submit(fn, batchable).result()
+
+    def close(self):
+        """Finish queued writes, then close the writer and every thread's reader."""
+        with self._readers_lock:
+            self._closed = True
+            readers = list(self._readers)
+        if self._worker is not None:
+            self._finalizer()
+        for conn in readers:
+            conn.close()
 
 
 class DatabaseManager:
     """Manages SQLite database connections and queries.
 
-    Uses check_same_thread=False so the connection can be used from any
-    Flask request thread. A lock is used for thread-safe access.
+    SELECTs run on a per-thread read-only connection without taking any
+    lock, everything else goes through a single read-write connection.
     """
 
-    def __init__(self):
-        """Initialize database manager."""
+    def __init__(self, pragmas: Optional[Dict[str, Any]] = None):
+        """Initialize database manager.
+
+        Args:
+            pragmas: PRAGMAs to run on every new connection, on top of (and
+                overriding) the defaults, e.g. {"cache_size": -16000}.
+                journal_mode only applies to the read-write connection.
+        """
         self.current_db_path: Optional[str] = None
-        self.connection: Optional[sqlite3.Connection] = None
-        self._lock = threading.Lock()
+        # Rendered once here, not on every connect
+        pragmas = dict(pragmas or {})
+        self._journal_mode = str(pragmas.get("journal_mode", "wal")).lower()
+        self._writer_pragmas = _WRITER_PRAGMAS + _pragma_script(pragmas)
+        pragmas.pop("journal_mode", None)
+        self._reader_pragmas = _READER_PRAGMAS + _pragma_script(pragmas)
+        self._pool: Optional[_ConnectionPool] = None
+        self._lock = threading.Lock()  # Guards connect/disconnect
+        # (schema version, cache) of introspection results (tables, schema, columns,
+        # indexes), replaced as one attribute so the two always belong together
+        self._meta: tuple = (None, _TTLCache(maxsize=_META_CACHE_SIZE, ttl=_META_CACHE_TTL))
+        # Bumped after every statement run on the writer, so data-dependent caches can key on it
+        self._write_generation = 0
+        # (columns, total_count) of paginated queries, keyed by (schema version, write generation, query hash)
+        self._page_meta_cache = _TTLCache(maxsize=256, ttl=60)
+        # Whole paginated results, briefly, so dashboard refreshes of the same page skip SQLite
+        self._result_cache = _TTLCache(maxsize=256, ttl=10)
+        # get_tables() result for a couple of seconds, so polls skip even the schema-version check
+        self._tables_cache = _TTLCache(maxsize=4, ttl=2.0)
+        # Read calls currently executing, so identical concurrent calls wait for the same result
+        self._inflight: Dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
     
-    def connect(self, db_path: str) -> bool:
+    def connect(self, db_path: str, force_reconnect: bool = False) -> bool:
+        """Connect to db_path, keeping the current connections if it is already open and healthy."""
         try:
             path = Path(db_path)
             if not path.exists():
                 return False
+            # Reopening would drop the per-thread readers, their statement
+            # caches and the metadata caches for nothing
+            if not force_reconnect and db_path == self.current_db_path and self._verify():
+                return True
             
+            pool = _ConnectionPool(db_path, self._writer_pragmas, self._reader_pragmas)
+            self._check_journal_mode(pool)
             with self._lock:
-                if self.connection:
-                    self.connection.close()
-                # check_same_thread=False allows use from any Flask request thread
-                self.connection = sqlite3.connect(
-                    db_path,
-                    check_same_thread=False,
-                )
-                self.connection.row_factory = sqlite3.Row  # Return rows as dict-like objects
+                old_pool, self._pool = self._pool, pool
                 self.current_db_path = db_path
+                self._reset_meta()
+                self._page_meta_cache.clear()
+                self._result_cache.clear()
+                self._tables_cache.clear()
+            if old_pool:
+                old_pool.close()
             return True
         except Exception:
             return False
     
+    def _verify(self) -> bool:
+        """Return True if the current connection still answers a trivial query."""
+        try:
+            with self.acquire() as conn:
+                conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
     def disconnect(self):
         with self._lock:
-            if self.connection:
-                self.connection.close()
-                self.connection = None
-                self.current_db_path = None
+            pool, self._pool = self._pool, None
+            self.current_db_path = None
+            self._reset_meta()
+            self._page_meta_cache.clear()
+            self._result_cache.clear()
+            self._tables_cache.clear()
+        if pool:
+            pool.close()
+
+    def _check_journal_mode(self, pool: _ConnectionPool):
+        """Warn if SQLite ignored the requested journal mode (e.g. WAL on a network filesystem)."""
+        if pool.read_only:
+            warnings.warn(
+                f"'{pool.db_path}' is not writable; opened it read-only, write queries will fail.",
+                UserWarning
+            )
+            return
+        with pool.writer() as conn:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode.lower() != self._journal_mode:
+            warnings.warn(
+                f"SQLite kept journal_mode={mode} for '{pool.db_path}' instead of "
+                f"{self._journal_mode}; readers may block on writes.",
+                UserWarning
+            )
+
+    @contextmanager
+    def acquire(self, readonly: bool = True):
+        """Use this thread's read-only connection, or hold the writer if readonly is False."""
+        pool = self._pool
+        if pool is None:
+            raise sqlite3.ProgrammingError("No database connection")
+        with (pool.reader() if readonly else pool.writer()) as conn:
+            yield conn
+
+    def _coalesce(self, key: tuple, fn):
+        """Return fn(), or wait for and share the result of an identical call already in flight."""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
     
-    def execute_query(self, query: str) -> Dict[str, Any]:
-        if not self.connection:
+    def execute_query(self, query: str, max_rows: Optional[int] = None) -> Dict[str, Any]:
+        """Execute a query. For SELECTs, at most max_rows rows are fetched (all if None)."""
+        if not self.is_connected():
             return {
                 "success": False,
                 "error": "No database connection",
-                "results": [],
+                "rows": [],
                 "columns": []
             }
         
-        with self._lock:
-            try:
-                cursor = self.connection.cursor()
-                cursor.execute(query)
-                
-                # Check if query returns results
-                if query.strip().upper().startswith("SELECT"):
-                    results = [dict(row) for row in cursor.fetchall()]
-                    columns = [description[0] for description in cursor.description] if cursor.description else []
-                else:
-                    # For INSERT, UPDATE, DELETE
-                    self.connection.commit()
-                    results = []
-                    columns = []
-                
-                return {
-                    "success": True,
-                    "results": results,
-                    "columns": columns,
-                    "rowcount": cursor.rowcount
-                }
-            except Exception as e:
-                return {
-                    "success": False,
-                    "error": str(e),
-                    "results": [],
-                    "columns": []
-                }
+        # Only plain SELECTs may use a read-only connection; anything else
+        # (WITH ... can wrap an INSERT) runs on the writer.
+        readonly = query.lstrip()[:6].upper() == "SELECT"
+        if readonly:
+            # Identical SELECTs arriving together (e.g. several panels loading) run once
+            return self._coalesce(
+                ("execute_query", self.current_db_path, query, max_rows),
+                lambda: self._run_query(query, max_rows, readonly),
+            )
+        return self._run_query(query, max_rows, readonly)
+
+    def _run_query(self, query: str, max_rows: Optional[int], readonly: bool) -> Dict[str, Any]:
+        try:
+            if readonly:
+                with self.acquire() as conn:
+                    rows, columns, rowcount = self._fetch_result(conn, query, max_rows)
+            else:
+                pool = self._pool
+                if pool is None:
+                    raise sqlite3.ProgrammingError("No database connection")
+                # Committed by the storage worker, possibly together with other queued writes
+                rows, columns, rowcount = pool.write(
+                    lambda conn: self._fetch_result(conn, query, max_rows),
+                    batchable=_BATCHABLE_RE.match(query) is not None,
+                )
+                self._write_generation += 1
+                if _DDL_RE.match(query):
+                    self._reset_meta()
+                    self.invalidate_tables_cache()
+
+            return {
+                "success": True,
+                "rows": rows,
+                "columns": columns,
+                "rowcount": rowcount
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "rows": [],
+                "columns": []
+            }
+
+    @staticmethod
+    def _fetch_result(conn: sqlite3.Connection, query: str, max_rows: Optional[int]) -> tuple:
+        """Run query on conn and return (rows, columns, rowcount), leaving no statement active."""
+        cursor = conn.cursor()
+        cursor.execute(query)
+        # Any statement that returns rows (SELECT, WITH, PRAGMA, EXPLAIN, RETURNING) has a description
+        if cursor.description is not None:
+            rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows)
+            # Not memoized per SQL text: SELECT * changes shape with the schema, and
+            # checking the schema version would cost more than this comprehension
+            columns = [description[0] for description in cursor.description]
+        else:
+            rows = []
+            columns = []
+        rowcount = cursor.rowcount
+        cursor.close()  # A partially fetched RETURNING would otherwise block the savepoint release
+        return rows, columns, rowcount
+
+    def iter_query(
+        self,
+        query: str,
+        max_rows: Optional[int] = None,
+        batch_size: int = 256,
+    ) -> Iterator[List[Any]]:
+        """Run a read-only query and stream its results without buffering them.
+
+        Yields the list of column names first, then lists of up to batch_size
+        row tuples until the result set (or max_rows) is exhausted. The reader
+        connection is held until the generator is exhausted or closed.
+        """
+        with self.acquire() as conn:
+            cursor = conn.cursor()
+            cursor.arraysize = batch_size
+            cursor.execute(query)
+            yield [d[0] for d in (cursor.description or [])]
+            remaining = max_rows
+            while remaining is None or remaining > 0:
+                rows = cursor.fetchmany(batch_size if remaining is None else min(batch_size, remaining))
+                if not rows:
+                    break
+                if remaining is not None:
+                    remaining -= len(rows)
+                yield rows
 
     def execute_query_paginated(
         self,
@@ -105,165 +632,337 @@ class DatabaseManager:
         page: int = 1,
         per_page: int = 50,
         max_results: int = 10000,
+        query_hash: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Execute a SELECT query with pagination. Returns one page of results and pagination metadata."""
-        if not self.connection:
+        """Execute a SELECT query with pagination. Returns one page of results and pagination metadata.
+
+        pagination["query_hash"] identifies the query. Passing it back when
+        requesting another page reuses the cached column list and total count
+        (while the schema and data are unchanged), so only the page rows are fetched.
+        """
+        if not self.is_connected():
             return {
                 "success": False,
                 "error": "No database connection",
-                "results": [],
+                "rows": [],
                 "columns": [],
                 "pagination": None,
             }
         q = query.strip().rstrip(";").strip()
-        if not q.upper().startswith("SELECT"):
+        if q[:6].upper() != "SELECT":
             return self.execute_query(query)
 
         page = max(1, page)
         per_page = max(1, min(per_page, max_results))
+        return self._coalesce(
+            ("execute_query_paginated", self.current_db_path, q, page, per_page, query_hash),
+            lambda: self._run_paginated(q, page, per_page, query_hash),
+        )
 
-        with self._lock:
-            try:
-                cursor = self.connection.cursor()
-                base_query = _strip_limit_offset(q)
+    def _run_paginated(self, q: str, page: int, per_page: int, query_hash: Optional[str]) -> Dict[str, Any]:
+        base_query = _strip_limit_offset(q)
+        # Looked up before touching SQLite at all. Not keyed on the schema version:
+        # the dashboard's own DDL bumps the write generation, other processes'
+        # changes (schema or data alike) show up once the short TTL runs out
+        result_key = (self.current_db_path, self._write_generation, base_query, page, per_page)
+        cached_result = self._result_cache.get(result_key)
+        if cached_result is not None:
+            return cached_result
+        try:
+            with self.acquire() as conn:
+                cursor = conn.cursor()
                 count_query = f"SELECT COUNT(*) FROM ({base_query}) AS _cnt"
-                cursor.execute(count_query)
-                total_count = cursor.fetchone()[0]
-
                 offset = (page - 1) * per_page
                 limit = per_page
-                total_pages = (total_count + per_page - 1) // per_page if total_count > 0 else 0
+                schema_token = self._schema_token(conn)
 
-                data_query = f"{base_query} LIMIT {limit} OFFSET {offset}"
-                cursor.execute(data_query)
-                results = [dict(row) for row in cursor.fetchall()]
-                columns = [d[0] for d in (cursor.description or [])]
+                base_hash = hashlib.sha1(base_query.encode("utf-8")).hexdigest()
+                meta_key = (schema_token, self._write_generation, base_hash)
+                cached_meta = self._page_meta_cache.get(meta_key) if query_hash == base_hash else None
+
+                if cached_meta is not None:
+                    columns, total_count = cached_meta
+                    cursor.execute(f"{base_query} LIMIT ? OFFSET ?", (limit, offset))
+                    rows = cursor.fetchall()
+                else:
+                    # Not folded into one "SELECT *, COUNT(*) OVER () FROM (base)": the
+                    # window buffers the whole result before returning the first row
+                    # (in RAM, with temp_store=MEMORY), and the subquery renames
+                    # duplicate column names (id, id:1). COUNT(*) can skip row decoding
+                    # and the page query stops after LIMIT rows; the page-meta cache
+                    # saves the count on further pages.
+                    cursor.execute(count_query)
+                    total_count = cursor.fetchone()[0]
+                    cursor.execute(f"{base_query} LIMIT ? OFFSET ?", (limit, offset))
+                    rows = cursor.fetchall()
+                    columns = [d[0] for d in (cursor.description or [])]
+                self._page_meta_cache.set(meta_key, (columns, total_count))
+
+                total_pages = (total_count + per_page - 1) // per_page if total_count > 0 else 0
+                # First and last page plus up to two pages either side of the current one, in order
+                page_numbers = (
+                    [1, *range(max(2, page - 2), min(total_pages - 1, page + 2) + 1), total_pages]
+                    if total_pages > 1 else []
+                )
 
                 pagination = {
                     "page": page,
                     "per_page": per_page,
                     "total_count": total_count,
                     "total_pages": total_pages,
+                    "query_hash": base_hash,
+                    "page_numbers": page_numbers,
                 }
 
-                return {
+                result = {
                     "success": True,
-                    "results": results,
+                    "rows": rows,
                     "columns": columns,
-                    "rowcount": len(results),
+                    "rowcount": len(rows),
                     "pagination": pagination,
                 }
-            except Exception as e:
-                return {
-                    "success": False,
-                    "error": str(e),
-                    "results": [],
-                    "columns": [],
-                    "pagination": None,
-                }
+                self._result_cache.set(result_key, result)
+                return result
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "rows": [],
+                "columns": [],
+                "pagination": None,
+            }
 
+    def _schema_token(self, conn: sqlite3.Connection) -> int:
+        """Return the schema cookie, which SQLite bumps on every schema change.
+
+        PRAGMA data_version is deliberately not part of the token: it is
+        per-connection (so it differs between per-thread readers) and only data,
+        not schema, changes it.
+        """
+        return conn.execute("PRAGMA schema_version").fetchone()[0]
+
+    def _reset_meta(self, version: Optional[int] = None) -> _TTLCache:
+        """Start an empty introspection cache for schema version (None: unknown yet)."""
+        cache = _TTLCache(maxsize=_META_CACHE_SIZE, ttl=_META_CACHE_TTL)
+        self._meta = (version, cache)
+        return cache
+
+    def _cached_meta(self, conn: sqlite3.Connection, key: tuple, fetch):
+        """Return fetch(cursor) for key, reusing the result while the schema is unchanged."""
+        token = self._schema_token(conn)
+        # Read once: a concurrent reset replaces version and cache together, so a
+        # result is only ever stored in the cache of the version it was read under
+        version, cache = self._meta
+        if version != token:
+            cache = self._reset_meta(token)
+        result = cache.get(key)
+        if result is None:
+            result = fetch(conn.cursor())
+            cache.set(key, result)
+        return result
+
+    @_coalesced
     def get_tables(self) -> List[str]:
-        if not self.connection:
+        if not self.is_connected():
             return []
         
-        with self._lock:
-            try:
-                cursor = self.connection.cursor()
-                cursor.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name"
-                )
-                return [row[0] for row in cursor.fetchall()]
-            except Exception:
-                return []
+        tables = self._tables_cache.get(self.current_db_path)
+        if tables is not None:
+            return tables
+        try:
+            with self.acquire() as conn:
+                tables = self._cached_meta(conn, ("get_tables",), self._fetch_tables)
+        except Exception:
+            return []
+        self._tables_cache.set(self.current_db_path, tables)
+        return tables
+
+    def invalidate_tables_cache(self):
+        """Forget the short-lived get_tables() result, e.g. after changing the schema."""
+        self._tables_cache.clear()
+
+    @_coalesced
+    def list_tables_full(self) -> List[TableInfo]:
+        """Return TableInfo for every user table and view, sorted by name. Empty list on error."""
+        if not self.is_connected():
+            return []
+        try:
+            with self.acquire() as conn:
+                return self._cached_meta(conn, ("list_tables_full",), self._fetch_tables_full)
+        except Exception:
+            return []
+
+    def _fetch_tables_full(self, cursor: sqlite3.Cursor) -> List[TableInfo]:
+        return [TableInfo(*row) for row in cursor.execute(_TABLE_LIST_SQL).fetchall()]
+
+    def cached_tables(self) -> List[str]:
+        """Return the last table list without touching SQLite, loading it via get_tables() if there is none.
+
+        Schema changes made by other processes only show up once another
+        introspection call has noticed the new schema version.
+        """
+        tables = self._meta[1].get(("get_tables",))
+        return self.get_tables() if tables is None else tables
+
+    def _fetch_tables(self, cursor: sqlite3.Cursor) -> List[str]:
+        # Derived from the full list, which the table pages can then reuse without a query
+        tables = self._cached_meta(cursor.connection, ("list_tables_full",), self._fetch_tables_full)
+        return [t.name for t in tables if t.type != "view"]  # Virtual tables count as tables
     
+    @_coalesced
     def get_table_schema(self, table_name: str) -> Dict[str, Any]:
-        if not self.connection:
+        if not self.is_connected():
             return {"success": False, "error": "No database connection"}
         
-        with self._lock:
-            try:
-                cursor = self.connection.cursor()
-                cursor.execute(
-                    "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('table', 'view')",
-                    (table_name,)
+        try:
+            with self.acquire() as conn:
+                return self._cached_meta(
+                    conn,
+                    ("get_table_schema", table_name),
+                    lambda cursor: self._fetch_table_schema(cursor, table_name),
                 )
-                result = cursor.fetchone()
-                if result:
-                    return {
-                        "success": True,
-                        "schema": result[0]
-                    }
-                else:
-                    return {"success": False, "error": "Table not found"}
-            except Exception as e:
-                return {
-                    "success": False,
-                    "error": str(e)
-                }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    def _fetch_table_schema(self, cursor: sqlite3.Cursor, table_name: str) -> Dict[str, Any]:
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('table', 'view')",
+            (table_name,)
+        )
+        result = cursor.fetchone()
+        if result:
+            return {
+                "success": True,
+                "schema": result[0]
+            }
+        else:
+            return {"success": False, "error": "Table not found"}
 
     def _safe_table_identifier(self, table_name: str) -> Optional[str]:
-        """Return table name if it is a safe SQL identifier (alphanumeric + underscore), else None."""
-        if not table_name or not table_name.strip():
+        """Return table name if it is a safe SQL identifier (ASCII letters, digits, underscore), else None."""
+        if not table_name:
             return None
         s = table_name.strip()
-        if not s.replace("_", "").isalnum():
-            return None
-        return s
+        return s if _IDENT_RE.match(s) else None
 
+    @_coalesced
     def get_all_columns(self, table_name: str) -> List[Dict[str, Any]]:
         """Return list of column info dicts for a table. Empty list on error."""
-        if not self.connection:
+        if not self.is_connected():
             return []
-        with self._lock:
-            try:
-                cursor = self.connection.cursor()
-                # PRAGMA table_info(?) does not support bound params (SQLite limitation).
-                # Try table-valued function first (SQLite 3.16+), then fallback to PRAGMA with safe identifier.
-                try:
-                    cursor.execute("SELECT * FROM pragma_table_info(?)", (table_name,))
-                except sqlite3.OperationalError:
-                    safe_name = self._safe_table_identifier(table_name)
-                    if safe_name is None:
-                        return []
-                    cursor.execute(f'PRAGMA table_info("{safe_name}")')
-                columns = []
-                for row in cursor.fetchall():
-                    columns.append({
-                        "name": row[1],
-                        "type": row[2],
-                        "notnull": bool(row[3]),
-                        "dflt_value": row[4],
-                        "pk": bool(row[5]),
-                    })
-                return columns
-            except Exception:
+        try:
+            with self.acquire() as conn:
+                return self._cached_meta(
+                    conn,
+                    ("get_all_columns", table_name),
+                    lambda cursor: [c._asdict() for c in self._fetch_all_columns(cursor, table_name)],
+                )
+        except Exception:
+            return []
+
+    def _fetch_all_columns(self, cursor: sqlite3.Cursor, table_name: str) -> List[ColumnInfo]:
+        # PRAGMA table_info(?) does not support bound params (SQLite limitation).
+        # Try table-valued function first (SQLite 3.16+), then fallback to PRAGMA with safe identifier.
+        try:
+            cursor.execute("SELECT * FROM pragma_table_info(?)", (table_name,))
+        except sqlite3.OperationalError:
+            safe_name = self._safe_table_identifier(table_name)
+            if safe_name is None:
                 return []
+            cursor.execute(f'PRAGMA table_info("{safe_name}")')
+        return [ColumnInfo(row[1], row[2], bool(row[3]), row[4], bool(row[5])) for row in cursor.fetchall()]
 
+    @_coalesced
     def get_indexes(self, table_name: str) -> List[Dict[str, Any]]:
         """Return list of index info dicts for a table. Empty list on error."""
-        if not self.connection:
+        if not self.is_connected():
             return []
-        with self._lock:
-            try:
-                cursor = self.connection.cursor()
-                try:
-                    cursor.execute("SELECT * FROM pragma_index_list(?)", (table_name,))
-                except sqlite3.OperationalError:
-                    safe_name = self._safe_table_identifier(table_name)
-                    if safe_name is None:
-                        return []
-                    cursor.execute(f'PRAGMA index_list("{safe_name}")')
-                indexes = []
-                for row in cursor.fetchall():
-                    indexes.append({
-                        "name": row[1],
-                        "unique": bool(row[2]),
-                        "origin": row[3] or "",
-                    })
-                return indexes
-            except Exception:
+        try:
+            with self.acquire() as conn:
+                return self._cached_meta(
+                    conn,
+                    ("get_indexes", table_name),
+                    lambda cursor: [i._asdict() for i in self._fetch_indexes(cursor, table_name)],
+                )
+        except Exception:
+            return []
+
+    def _fetch_indexes(self, cursor: sqlite3.Cursor, table_name: str) -> List[IndexInfo]:
+        try:
+            cursor.execute("SELECT * FROM pragma_index_list(?)", (table_name,))
+        except sqlite3.OperationalError:
+            safe_name = self._safe_table_identifier(table_name)
+            if safe_name is None:
                 return []
+            cursor.execute(f'PRAGMA index_list("{safe_name}")')
+        return [IndexInfo(row[1], bool(row[2]), row[3] or "") for row in cursor.fetchall()]
+
+    @_coalesced
+    def get_table_details(self, table_name: str) -> Dict[str, Any]:
+        """Return schema SQL, columns and indexes for a table in one connection checkout.
+
+        Returns a dict with "schema" ("" if the table is not found), "columns"
+        (ColumnInfo tuples) and "indexes" (IndexInfo tuples).
+        """
+        if not self.is_connected():
+            return {"schema": "", "columns": [], "indexes": []}
+        try:
+            with self.acquire() as conn:
+                return self._cached_meta(
+                    conn,
+                    ("get_table_details", table_name),
+                    lambda cursor: self._fetch_table_details(cursor, table_name),
+                )
+        except Exception:
+            return {"schema": "", "columns": [], "indexes": []}
+
+    def _fetch_table_details(self, cursor: sqlite3.Cursor, table_name: str) -> Dict[str, Any]:
+        try:
+            schema, columns, indexes = cursor.execute(_TABLE_DETAILS_SQL, (table_name,)).fetchone()
+        except sqlite3.OperationalError:
+            return self._fetch_table_details_rows(cursor, table_name)
+        return {
+            "schema": (schema or "").strip(),
+            "columns": [
+                ColumnInfo(name, type_, bool(notnull), dflt_value, bool(pk))
+                for name, type_, notnull, dflt_value, pk in json.loads(columns)
+            ],
+            "indexes": [
+                IndexInfo(name, bool(unique), origin or "")
+                for name, unique, origin in json.loads(indexes)
+            ],
+        }
+
+    def _fetch_table_details_rows(self, cursor: sqlite3.Cursor, table_name: str) -> Dict[str, Any]:
+        try:
+            rows = cursor.execute(_TABLE_DETAILS_ROWS_SQL, (table_name,)).fetchall()
+        except sqlite3.OperationalError:
+            # No pragma table-valued functions either: one query per part
+            return self._fetch_table_details_separately(cursor, table_name)
+        schema = next((row[1] for row in rows if row[0] == 2), None)
+        return {
+            "schema": (schema or "").strip(),
+            "columns": [
+                ColumnInfo(name, type_, bool(notnull), dflt_value, bool(pk))
+                for kind, name, type_, notnull, dflt_value, pk in rows if kind == 0
+            ],
+            "indexes": [
+                IndexInfo(name, bool(unique), origin or "")
+                for kind, name, unique, origin, _, _ in rows if kind == 1
+            ],
+        }
+
+    def _fetch_table_details_separately(self, cursor: sqlite3.Cursor, table_name: str) -> Dict[str, Any]:
+        schema_result = self._fetch_table_schema(cursor, table_name)
+        return {
+            "schema": (schema_result.get("schema") or "").strip() if schema_result.get("success") else "",
+            "columns": self._fetch_all_columns(cursor, table_name),
+            "indexes": self._fetch_indexes(cursor, table_name),
+        }
 
     def is_connected(self) -> bool:
         """Check if database is connected."""
-        return self.connection is not None
+        return self._pool is not None
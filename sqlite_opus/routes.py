@@ -1,14 +1,51 @@
 """Flask routes for SQLite Opus dashboard."""
 
 import csv
+import gzip
+import hashlib
+import hmac
 import io
+import json
 import re
+import zlib
 from functools import wraps
-from flask import Blueprint, render_template, request, jsonify, Flask, Response
+from flask import Blueprint, request, jsonify, Flask, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 
 # Import config from main module (avoid circular import by importing inside bind())
 from sqlite_opus import config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # orjson not installed, fall back to jsonify
+
+# Responses eligible for gzip, and the size below which compressing isn't worth it
+_GZIP_MIMETYPES = {"application/json", "text/html"}
+_GZIP_MIN_SIZE = 1024
+# /api/status body while no database is connected. Only the bytes are shared: a
+# Response object can't be, after_request hooks (CORS, ...) modify its headers.
+_DISCONNECTED_STATUS = b'{"connected":false,"db_path":null,"tables":[]}'
+# Template output pieces joined per streamed chunk
+_TEMPLATE_STREAM_BUFFER = 256
+# Templates compiled when the blueprint is registered (see preload_templates)
+_INDEX_TEMPLATE = "sqlite_opus/index.html"
+_RESULTS_TEMPLATE = "sqlite_opus/partials/query_results.html"
+
+# Write statements (DML and DDL), matched in one pass without uppercasing the query
+_DML_RE = re.compile(
+    r"\b(?:INSERT\s+INTO\b|UPDATE\s+\w|DELETE\s+FROM\b|CREATE\s+|TRUNCATE\s+|REPLACE\s+INTO\b|DROP\s+|ALTER\s+)",
+    re.IGNORECASE,
+)
+# Leading keywords that settle _classify() without scanning the query. Statements
+# can't be chained (sqlite3 runs one per execute), so the first keyword decides;
+# only WITH (which can lead into INSERT/UPDATE/DELETE) or a head that isn't a
+# keyword (a leading comment, long indentation) falls back to _DML_RE.
+_DML_PREFIXES = ("INSERT", "UPDATE", "DELETE", "CREATE", "TRUNCATE", "REPLACE", "DROP", "ALTER")
+_READ_ONLY_PREFIXES = ("PRAGMA", "EXPLAIN")
+# A LIMIT keyword, not a word that merely contains it (e.g. a "time_limits" column)
+_LIMIT_RE = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+
 def register_routes(bp: Blueprint, app: Flask):
     """
     Register all routes with the blueprint.
@@ -17,44 +54,104 @@ def register_routes(bp: Blueprint, app: Flask):
         bp: Blueprint instance to register routes with
         app: Flask application instance (for accessing database manager)
     """
+    # Set by bind()/create_app() before routes are registered, and never replaced
+    db_manager = app.sqlite_opus_db_manager
     
+    @bp.after_request
+    def gzip_response(response):
+        """Gzip large JSON/HTML responses (query results, table info) when the client accepts it."""
+        if (
+            response.status_code != 200
+            or response.mimetype not in _GZIP_MIMETYPES
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or not request.accept_encodings.quality("gzip")
+        ):
+            return response
+        data = response.get_data()
+        if len(data) < _GZIP_MIN_SIZE:
+            return response
+        # Level 1 gets most of the size reduction on repetitive markup/JSON for little CPU
+        response.set_data(gzip.compress(data, compresslevel=1))
+        response.headers["Content-Encoding"] = "gzip"
+        response.vary.add("Accept-Encoding")
+        return response
+
+    def streamed_response(chunks, mimetype, headers=None):
+        """Stream byte chunks, gzipped on the fly if the client accepts it (gzip_response skips streams)."""
+        headers = dict(headers or {})
+        if request.accept_encodings.quality("gzip"):
+            chunks = _gzip_chunks(chunks)
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+    # Compiled index and query-results templates, set by preload_templates
+    index_template = results_template = None
+
+    def hot_template(preloaded, name):
+        """Return the preloaded template, or a fresh lookup when Jinja auto-reloads (debug mode).
+
+        get_template() is cached by Jinja and only recompiles a template whose
+        file changed, so edits show up without a restart.
+        """
+        return app.jinja_env.get_template(name) if app.jinja_env.auto_reload else preloaded
+
+    @bp.record_once
+    def preload_templates(state):
+        """Compile the hot templates up front, so the first page load and query don't pay for it.
+
+        Runs when the blueprint is registered: that is when the app's loader
+        starts searching the blueprint's template folder.
+        """
+        nonlocal index_template, results_template
+        env = state.app.jinja_env
+        index_template = env.get_template(_INDEX_TEMPLATE)
+        results_template = env.get_template(_RESULTS_TEMPLATE)
+
     @bp.route("/")
     @basic_auth_required
     def index():
-        """Render main dashboard page."""
+        """Render main dashboard page, answering 304 when the client's copy is current."""
         # Pass config info to template (blueprint_name for correct static file URLs)
         has_preconfigured_db = config.db_path is not None
         tables = []
-        if has_preconfigured_db and app.sqlite_opus_db_manager.is_connected():
-            tables = app.sqlite_opus_db_manager.get_tables()
-        return render_template(
-            "sqlite_opus/index.html",
-            has_preconfigured_db=has_preconfigured_db,
-            db_path=config.db_path if has_preconfigured_db else None,
-            blueprint_name=config.blueprint_name,
-            tables=tables,
-        )
+        if has_preconfigured_db and db_manager.is_connected():
+            tables = db_manager.get_tables()
+        context = {
+            "has_preconfigured_db": has_preconfigured_db,
+            "db_path": config.db_path if has_preconfigured_db else None,
+            "blueprint_name": config.blueprint_name,
+            "tables": tables,
+        }
+        app.update_template_context(context)  # Same globals as render_template (request, g, ...)
+        body = hot_template(index_template, _INDEX_TEMPLATE).render(context).encode()
+        response = Response(body, mimetype="text/html")
+        # Weak: gzip_response may re-encode the body, the content stays the same
+        response.set_etag(hashlib.blake2b(body, digest_size=16).hexdigest(), weak=True)
+        return response.make_conditional(request)
     
     @bp.route("/api/connect", methods=["POST"])
     def connect_database():
         """Connect to a SQLite database."""
-        data = request.get_json()
+        data = _request_json()
+        if not isinstance(data, dict):
+            return _json({"success": False, "error": "Invalid JSON"}), 400
         db_path = data.get("db_path")
         
         if not db_path:
-            return jsonify({"success": False, "error": "Database path required"}), 400
+            return _json({"success": False, "error": "Database path required"}), 400
         
-        db_manager = app.sqlite_opus_db_manager
         success = db_manager.connect(db_path)
         
         if success:
-            return jsonify({
+            return _json({
                 "success": True,
                 "message": "Connected successfully",
                 "tables": db_manager.get_tables()
             })
         else:
-            return jsonify({
+            return _json({
                 "success": False,
                 "error": "Failed to connect to database"
             }), 400
@@ -62,167 +159,295 @@ def register_routes(bp: Blueprint, app: Flask):
     @bp.route("/api/disconnect", methods=["POST"])
     def disconnect_database():
         """Disconnect from current database."""
-        app.sqlite_opus_db_manager.disconnect()
-        return jsonify({"success": True, "message": "Disconnected"})
+        db_manager.disconnect()
+        return _json({"success": True, "message": "Disconnected"})
     
     @bp.route("/api/status", methods=["GET"])
     def get_status():
         """Get current connection status."""
-        db_manager = app.sqlite_opus_db_manager
-        return jsonify({
-            "connected": db_manager.is_connected(),
-            "db_path": db_manager.current_db_path,
-            "tables": db_manager.get_tables() if db_manager.is_connected() else []
-        })
+        # Polled frequently: answered from the cached table list (or a constant body
+        # when disconnected), and with a bare 304 while nothing changed
+        if not db_manager.is_connected():
+            return _conditional(("status", None), lambda: Response(_DISCONNECTED_STATUS, mimetype="application/json"))
+        db_path, tables = db_manager.current_db_path, db_manager.cached_tables()
+        return _conditional(
+            ("status", db_path, tuple(tables)),
+            lambda: _json({"connected": True, "db_path": db_path, "tables": tables}),
+        )
     
     @bp.route("/api/tables", methods=["GET"])
     def get_tables():
         """Get list of all tables."""
-        db_manager = app.sqlite_opus_db_manager
         if not db_manager.is_connected():
-            return jsonify({"success": False, "error": "Not connected"}), 400
+            return _json({"success": False, "error": "Not connected"}), 400
         
         tables = db_manager.get_tables()
-        return jsonify({"success": True, "tables": tables})
+        return _conditional(("tables", tuple(tables)), lambda: _json({"success": True, "tables": tables}))
     
     @bp.route("/api/table/<table_name>/", methods=["GET"])
     def get_table_info_partial(table_name):
         """Return HTML with out-of-band swaps for columns, indexes, and schema (one request, three panel updates)."""
-        db_manager = app.sqlite_opus_db_manager
         if not db_manager.is_connected() or not table_name:
             return "", 400
-        columns = db_manager.get_all_columns(table_name)
-        indexes = db_manager.get_indexes(table_name)
-        schema_result = db_manager.get_table_schema(table_name)
-        schema = (schema_result.get("schema") or "").strip() if schema_result.get("success") else ""
+        details = db_manager.get_table_details(table_name)
+        from flask import render_template
+
         return render_template(
             "sqlite_opus/partials/table_info.html",
             table_name=table_name,
-            columns=columns,
-            indexes=indexes,
-            schema=schema,
+            columns=details["columns"],
+            indexes=details["indexes"],
+            schema=details["schema"],
         )
 
-    def get_query_result(query, page=None, per_page=None):
+    def get_query_result(query, page=None, per_page=None, query_hash=None):
         """Run query and return result dict for the partial template."""
-        db_manager = app.sqlite_opus_db_manager
         if not db_manager.is_connected():
             return {"success": False, "error": "Not connected"}
         if not query:
             return {"success": False, "error": "Query required"}
-        if contains_dml(query) and not config.allow_dml:
+        kind = _classify(query)
+        if kind == "DML" and not config.allow_dml:
             return {
                 "success": False,
                 "error": "DML queries (INSERT/UPDATE/DELETE/CREATE/TRUNCATE/REPLACE) are not allowed. Set config.allow_dml = True to enable."
             }
+        max_results = config.max_query_results
+        is_select = kind == "SELECT"
         use_pagination = (
-            query.strip().upper().startswith("SELECT")
+            is_select
             and page is not None
             and isinstance(page, int)
             and page >= 1
         )
         if use_pagination:
             if per_page is None or not isinstance(per_page, int) or per_page < 1:
-                per_page = getattr(config, "query_results_per_page", 50)
-            per_page = min(per_page, config.max_query_results)
+                per_page = config.query_results_per_page
+            per_page = min(per_page, max_results)
             return db_manager.execute_query_paginated(
                 query,
                 page=page,
                 per_page=per_page,
-                max_results=config.max_query_results,
+                max_results=max_results,
+                query_hash=query_hash,
             )
-        if query.strip().upper().startswith("SELECT"):
-            query_upper = query.upper()
-            if "LIMIT" not in query_upper:
-                query = f"{query.rstrip(';')} LIMIT {config.max_query_results}"
-        return db_manager.execute_query(query)
+        if is_select and not _LIMIT_RE.search(query):
+            query = f"{query.rstrip(';')} LIMIT {max_results}"
+        return db_manager.execute_query(query, max_rows=max_results)
 
     @bp.route("/api/query/", methods=["POST"])
     def execute_query():
-        """Execute a SQL query and return HTML partial (results table + pagination). Accepts JSON or form data (HTMX)."""
-        data = request.get_json(silent=True) or {}
+        """Execute a SQL query and return HTML partial (results table + pagination). Accepts JSON or form data (HTMX).
+
+        Clients that prefer application/json over text/html (e.g. a fetch()
+        with that Accept header) get the result as JSON and skip rendering.
+        """
+        wants_json = request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json"
+        data = _request_json(force=False)
+        if not isinstance(data, dict):
+            data = {}
         if not data and request.form:
             data = {
                 "query": request.form.get("query") or "",
                 "page": request.form.get("page"),
                 "per_page": request.form.get("per_page"),
+                "query_hash": request.form.get("query_hash"),
             }
         query = (data.get("query") or "").strip()
         if not query:
+            if wants_json:
+                return _json({"success": False, "error": "Query required"}), 400
+            from flask import render_template
+
             return render_template(
-                "sqlite_opus/partials/query_results.html",
+                _RESULTS_TEMPLATE,
                 success=False,
                 error="Query required",
-                results=[],
+                rows=[],
                 columns=[],
                 pagination=None,
             ), 400
-        page = 1
-        try:
-            p = data.get("page")
-            if p is not None:
-                page = int(p)
-        except (TypeError, ValueError):
-            pass
-        per_page = getattr(config, "query_results_per_page", 20)
-        try:
-            pp = data.get("per_page")
-            if pp is not None:
-                per_page = int(pp)
-        except (TypeError, ValueError):
-            pass
-        result = get_query_result(query, page=page, per_page=per_page)
+        page = _posint(data.get("page"), 1)
+        per_page = _posint(data.get("per_page"), config.query_results_per_page)
+        result = get_query_result(query, page=page, per_page=per_page, query_hash=data.get("query_hash"))
         pagination = result.get("pagination")
-        page_numbers = []
-        if pagination and pagination.get("total_pages", 0) > 1:
-            pn = pagination.get("page", 1)
-            total_pages = pagination.get("total_pages", 0)
-            show = sorted({1, total_pages} | set(range(max(1, pn - 2), min(total_pages, pn + 2) + 1)))
-            page_numbers = show
-        return render_template(
-            "sqlite_opus/partials/query_results.html",
-            success=result.get("success"),
-            error=result.get("error"),
-            results=result.get("results", []),
-            columns=result.get("columns", []),
-            current_query=query,
-            pagination=pagination,
-            page_numbers=page_numbers,
-        )
+        page_numbers = pagination.get("page_numbers", []) if pagination else []
+        if wants_json:
+            # _dumps, not _json: rows can hold BLOBs, rendered with str() as in the HTML table
+            body = _dumps({
+                "success": result.get("success"),
+                "error": result.get("error"),
+                "columns": result.get("columns", []),
+                "rows": result.get("rows", []),
+                "pagination": pagination,
+                "page_numbers": page_numbers,
+            })
+            return Response(body, mimetype="application/json")
+        context = {
+            "success": result.get("success"),
+            "error": result.get("error"),
+            "rows": result.get("rows", []),
+            "columns": result.get("columns", []),
+            "current_query": query,
+            "pagination": pagination,
+            "page_numbers": page_numbers,
+        }
+        app.update_template_context(context)
+        # Stream the table as it renders instead of building the whole page of HTML first;
+        # buffering groups Jinja's many small pieces into fewer, larger chunks
+        stream = hot_template(results_template, _RESULTS_TEMPLATE).stream(context)
+        stream.enable_buffering(_TEMPLATE_STREAM_BUFFER)
+        return streamed_response((chunk.encode() for chunk in stream), mimetype="text/html")
+
+    def start_export(format_name):
+        """Validate an export request and start its query.
+
+        Returns (error_response, None, None) or (None, columns, batches).
+        """
+        data = _request_json()
+        if not isinstance(data, dict):
+            return (_json({"success": False, "error": "Invalid JSON"}), 400), None, None
+        query = (data.get("query") or "").strip()
+        if not query:
+            return (_json({"success": False, "error": "Query required"}), 400), None, None
+        # A query classified as SELECT can't be DML, so no separate DML check is needed
+        if _classify(query) != "SELECT":
+            return (_json({"success": False, "error": f"Only SELECT queries can be exported as {format_name}"}), 400), None, None
+        if not db_manager.is_connected():
+            return (_json({"success": False, "error": "Not connected"}), 400), None, None
+        batches = db_manager.iter_query(query, max_rows=config.max_query_results)
+        try:
+            columns = next(batches)  # Executes the query, so errors surface before streaming
+        except Exception as e:
+            return (_json({"success": False, "error": str(e) or "Query failed"}), 400), None, None
+        return None, columns, batches
 
     @bp.route("/api/query/export", methods=["POST"])
     def export_query_csv():
         """Run the current SELECT query and return results as CSV download."""
-        data = request.get_json() or {}
-        query = (data.get("query") or "").strip()
-        if not query:
-            return jsonify({"success": False, "error": "Query required"}), 400
-        if not query.upper().startswith("SELECT"):
-            return jsonify({"success": False, "error": "Only SELECT queries can be exported as CSV"}), 400
-        if contains_dml(query) and not config.allow_dml:
-            return jsonify({
-                "success": False,
-                "error": "DML queries are not allowed. Set config.allow_dml = True to enable.",
-            }), 400
-        result = get_query_result(query, page=None, per_page=None)
-        if not result.get("success"):
-            return jsonify({"success": False, "error": result.get("error", "Query failed")}), 400
-        columns = result.get("columns", [])
-        results = result.get("results", [])
-        buf = io.StringIO()
-        writer = csv.writer(buf)
-        writer.writerow(columns)
-        for row in results:
-            writer.writerow([row.get(col) for col in columns])
-        csv_str = buf.getvalue()
-        return Response(
-            csv_str,
+        error, columns, batches = start_export("CSV")
+        if error:
+            return error
+
+        def generate():
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(columns)
+            yield buf.getvalue()
+            for rows in batches:
+                buf.seek(0)
+                buf.truncate()
+                writer.writerows(rows)
+                yield buf.getvalue()
+
+        return streamed_response(
+            (chunk.encode() for chunk in generate()),
             mimetype="text/csv",
             headers={"Content-Disposition": "attachment; filename=export.csv"},
         )
 
+    @bp.route("/api/query/json", methods=["POST"])
+    def export_query_json():
+        """Run a SELECT query and stream {"success", "columns", "rows"} as JSON, one fetch batch at a time."""
+        error, columns, batches = start_export("JSON")
+        if error:
+            return error
+        return streamed_response(_iter_json_rows(columns, batches), mimetype="application/json")
+
+def _conditional(state: tuple, build):
+    """Return build()'s response tagged with an ETag derived from state, or a bare 304 if the client has it.
+
+    Cache-Control: no-cache lets the browser keep the body but makes it
+    revalidate on every request, so a poll never misses a change.
+    """
+    etag = hashlib.blake2b(repr(state).encode(), digest_size=8).hexdigest()
+    # Weak, like the index page's: gzip_response may re-encode the body, the content stays the same
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)  # Nothing is serialized
+    else:
+        response = build()
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def _posint(value, default):
+    """Return value as a positive int, or default if it is missing, not a number or < 1.
+
+    Ints (JSON bodies) and digit strings (form posts) are handled without
+    raising, so bad input costs no exception. Strings longer than 18 digits
+    are rejected before int(), which refuses past 4300 digits and would
+    otherwise parse an absurd page number.
+    """
+    if isinstance(value, int):
+        return value if value >= 1 else default
+    if isinstance(value, str) and len(value) <= 18 and value.isascii() and value.isdigit():
+        return int(value) or default
+    return default
+
+def _request_json(force: bool = True):
+    """Parse the request body as JSON (with orjson when installed); None if it isn't valid JSON.
+
+    Without force, only bodies sent with a JSON content type are parsed.
+    """
+    if not force and not request.is_json:
+        return None
+    if orjson is None:
+        return request.get_json(force=True, silent=True)
+    try:
+        return orjson.loads(request.get_data(cache=True))
+    except orjson.JSONDecodeError:
+        return None
+
+def _json(obj):
+    """Return obj as a JSON response, serialized with orjson when it is installed."""
+    if orjson is None:
+        return jsonify(obj)
+    return Response(orjson.dumps(obj), mimetype="application/json")
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (requires orjson).
+
+    Only installed on apps the dashboard owns (see create_app); a host app
+    passed to bind() keeps its own provider, dashboard routes use _json().
+    """
+
+    def dumps(self, obj, **kwargs):
+        # DefaultJSONProvider.default covers what orjson lacks natively (e.g. Decimal, __html__)
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+def _gzip_chunks(chunks):
+    """Gzip a stream of byte chunks incrementally, one compressed chunk per input chunk that produces output."""
+    compressor = zlib.compressobj(1, zlib.DEFLATED, 31)  # wbits=31: gzip container, same level as gzip_response
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _dumps(obj) -> bytes:
+    """Compact JSON bytes; values JSON can't represent (BLOBs) are rendered with str() as in the HTML table."""
+    if orjson is None:
+        return json.dumps(obj, default=str, separators=(",", ":")).encode()
+    return orjson.dumps(obj, default=str)
+
+def _iter_json_rows(columns, batches):
+    """Yield a {"success", "columns", "rows"} JSON document, encoding each batch of rows as it is fetched."""
+    yield b'{"success":true,"columns":' + _dumps(columns) + b',"rows":['
+    sep = b""
+    for rows in batches:
+        if rows:
+            yield sep + _dumps(rows)[1:-1]  # Drop the batch's own brackets
+            sep = b","
+    yield b"]}"
+
 def basic_auth_required(f):
-    """Require HTTP Basic Auth if config.auth_user and config.auth_password are set."""
+    """Require HTTP Basic Auth if config.auth_user and config.auth_password are set.
+
+    Checked on every request, so credentials set on config after bind() apply too.
+    """
     @wraps(f)
     def decorated(*args, **kwargs):
         username = config.auth_user or ''
@@ -230,7 +455,13 @@ def basic_auth_required(f):
         if not username and not password:
             return f(*args, **kwargs)
         auth = request.authorization
-        if not auth or auth.username != username or auth.password != password:
+        # compare_digest takes the same time wherever the strings differ, so
+        # response timing doesn't reveal how much of a guess was right
+        if (
+            not auth
+            or not hmac.compare_digest((auth.username or "").encode(), username.encode())
+            or not hmac.compare_digest((auth.password or "").encode(), password.encode())
+        ):
             return Response(
                 'Login required',
                 401,
@@ -239,17 +470,23 @@ def basic_auth_required(f):
         return f(*args, **kwargs)
     return decorated
 
+def _classify(query: str) -> str:
+    """Return "SELECT", "DML" (DML or DDL, i.e. a write) or "OTHER" for a query, in one pass."""
+    # Only a short head is stripped and uppercased, never the whole query
+    head = query[:64].lstrip()[:8].upper()
+    if head.startswith("SELECT"):
+        return "SELECT"
+    if head.startswith(_DML_PREFIXES):
+        return "DML"
+    if head.startswith(_READ_ONLY_PREFIXES):
+        return "OTHER"
+    # A head under 8 characters of a longer query may be a keyword the slice cut
+    # short (deep indentation), not a whole one
+    if (len(head) == 8 or len(query) <= 64) and head[:1].isalpha() and not head.startswith("WITH"):
+        # Some other statement keyword (VALUES, BEGIN, ...): nothing after it can make it a write
+        return "OTHER"
+    return "DML" if _DML_RE.search(query) else "OTHER"
+
 def contains_dml(query: str) -> bool:
     """Return True if the query appears to be DML or DDL (write operations)."""
-    query_upper = query.strip().upper()
-    dml_patterns = [
-        r"\bINSERT\s+INTO\b",
-        r"\bUPDATE\s+\w",
-        r"\bDELETE\s+FROM\b",
-        r"\bCREATE\s+",
-        r"\bTRUNCATE\s+",
-        r"\bREPLACE\s+INTO\b",
-        r"\bDROP\s+",
-        r"\bALTER\s+",
-    ]
-    return any(re.search(p, query_upper) for p in dml_patterns)
+    return _classify(query) == "DML"
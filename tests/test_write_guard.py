@@ -0,0 +1,125 @@
+"""Tests for the allow_dml guard (_classify) and the storage worker's write batches and lifetime."""
+
+import gc
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from sqlite_opus.database import DatabaseManager, _ConnectionPool, _StorageWorker, _WRITER_PRAGMAS
+from sqlite_opus.routes import _classify, contains_dml
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "INSERT INTO t VALUES (1)",
+        "  insert into t values (1)",
+        "UPDATE t SET x = 1",
+        "DELETE FROM t",
+        "REPLACE INTO t VALUES (1)",
+        "CREATE TABLE u (x)",
+        "ALTER TABLE t ADD COLUMN y",
+        "DROP TABLE t",
+        "WITH x AS (SELECT 1) DELETE FROM t",
+        "with x as (select 1) insert into t select * from x",
+        "-- cleanup\nDROP TABLE t",
+        "/* cleanup */ DELETE FROM t",
+        " " * 80 + "DELETE FROM t",
+        " " * 60 + "DELETE FROM t",
+        "\t" * 62 + "INSERT INTO t VALUES (1)",
+        "\n" * 60 + "DROP TABLE t",
+        " " * 57 + "UPDATE t SET x = 1",
+        " " * 63 + "CREATE TABLE u (x)",
+        "DELETE\tFROM t",
+        "INSERT\nINTO t VALUES (1)",
+        "\n\tUPDATE t SET x = 1",
+    ],
+)
+def test_write_queries_are_dml(query):
+    assert _classify(query) == "DML"
+    assert contains_dml(query)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT 1",
+        "  select * from t",
+        "SELECT * FROM t WHERE name = 'DROP TABLE x'",
+        "WITH x AS (SELECT 1) SELECT * FROM x",
+        "PRAGMA table_info(t)",
+        "EXPLAIN QUERY PLAN SELECT 1",
+        "VALUES (1)",
+    ],
+)
+def test_read_queries_are_not_dml(query):
+    assert not contains_dml(query)
+
+
+def test_select_is_classified_select():
+    assert _classify("\n  select 1") == "SELECT"
+    assert _classify("WITH x AS (SELECT 1) SELECT * FROM x") == "OTHER"
+
+
+def test_failed_write_in_batch_leaves_the_others_committed(tmp_path):
+    path = str(tmp_path / "t.db")
+    conn = _ConnectionPool._open(path, _WRITER_PRAGMAS)
+    conn.execute("CREATE TABLE t (v TEXT UNIQUE)")
+    worker = _StorageWorker(conn, threading.Lock())
+
+    def insert(value):
+        return lambda c: c.execute("INSERT INTO t (v) VALUES (?)", (value,)).rowcount
+
+    futures = [Future() for _ in range(3)]
+    worker._run_batch([(insert(v), True, f) for v, f in zip(["a", "a", "b"], futures)])
+
+    assert all(f.done() for f in futures)  # Every write answered, none left waiting
+    assert futures[0].result() == 1
+    assert isinstance(futures[1].exception(), sqlite3.IntegrityError)
+    assert futures[2].result() == 1
+    assert not conn.in_transaction
+    conn.close()
+
+    other = sqlite3.connect(path)
+    assert other.execute("SELECT v FROM t ORDER BY v").fetchall() == [("a",), ("b",)]
+    other.close()
+
+
+def test_worker_keeps_serving_after_a_batch_raises(tmp_path):
+    conn = _ConnectionPool._open(str(tmp_path / "t.db"), _WRITER_PRAGMAS)
+    worker = _StorageWorker(conn, threading.Lock())
+    run_batch = worker._run_batch
+    calls = []
+
+    def failing_once(ops):
+        calls.append(ops)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("boom")
+        run_batch(ops)
+
+    worker._run_batch = failing_once
+    worker.start()
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="boom"):
+            worker.submit(lambda c: 1).result(timeout=5)
+        assert worker.submit(lambda c: c.execute("SELECT 2").fetchone()[0]).result(timeout=5) == 2
+    finally:
+        worker.stop()
+    assert not worker.is_alive()
+
+
+def test_writer_thread_stops_when_manager_is_dropped(tmp_path):
+    path = str(tmp_path / "t.db")
+    sqlite3.connect(path).close()
+    manager = DatabaseManager()
+    assert manager.connect(path)
+    assert manager.execute_query("CREATE TABLE t (x)")["success"]
+    worker = manager._pool._worker
+    assert worker.is_alive()
+
+    del manager
+    gc.collect()
+    worker.join(timeout=5)
+    assert not worker.is_alive()